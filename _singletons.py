@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Process-wide shared instances for the diagnostic scripts.
+Repeat calls within one process return the same object, so models it has
+already loaded stay loaded for later callers in that process. Nothing is
+shared between separate runs: each script invocation is its own process
+and loads its models again.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def model_manager():
+    from model_manager import ModelManager
+    return ModelManager()
+
+
+@lru_cache(maxsize=None)
+def license_extractor():
+    from license_extractor import LicenseExtractor
+    return LicenseExtractor()
+
+
+@lru_cache(maxsize=None)
+def database_manager():
+    from database import DatabaseManager
+    return DatabaseManager()
@@ -2,6 +2,7 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import tempfile
 import os
+import atexit
 import time
 from PIL import Image
 from pdf2image import convert_from_path
@@ -33,6 +34,7 @@ app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 model_manager = ModelManager()
+atexit.register(model_manager.shutdown)
 license_extractor = LicenseExtractor()
 db_manager = DatabaseManager()
 image_preprocessor = ImagePreprocessor() if OPENCV_AVAILABLE else None
@@ -40,12 +42,15 @@ image_preprocessor = ImagePreprocessor() if OPENCV_AVAILABLE else None
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'heic', 'heif'}
 ALLOWED_DOCUMENT_EXTENSIONS = {'pdf'}
 
+# Only the first page's result is used, so later PDF pages are never rasterized
+PDF_MAX_PAGES = 1
+
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 def convert_pdf_to_images(pdf_path):
     try:
-        images = convert_from_path(pdf_path, dpi=150)
+        images = convert_from_path(pdf_path, dpi=150, first_page=1, last_page=PDF_MAX_PAGES)
         temp_image_paths = []
 
         for i, image in enumerate(images):
@@ -143,9 +148,7 @@ def process_document():
         raw_ocr_text = result['raw_ocr_text']
         extracted_data = result['extracted_data']
 
-        normalized_data = license_extractor.validate_and_normalize(extracted_data)
-
-        validation_report = license_extractor.validate_data(normalized_data)
+        normalized_data, validation_report = license_extractor.normalize_and_validate(extracted_data)
 
         processing_time_ms = int((time.time() - start_time) * 1000)
 
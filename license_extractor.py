@@ -1,14 +1,80 @@
 import re
-import datetime
+import calendar
+import functools
 from typing import Dict, Any, List
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+LICENSE_PREFIX_PATTERN = re.compile(r'^(4d\s*DLN|DL#?|LIC#?|LICENSE#?)\s*', re.IGNORECASE)
+ZIP_PATTERN = re.compile(r'(\d{5})(?:-?(\d{4}))?')
+
+# Numeric date with a consistent separator: YYYY-MM-DD, MM/DD/YYYY, DD-MM-YY, ...
+DATE_PATTERN = re.compile(r'^(\d{1,4})([-/])(\d{1,2})\2(\d{1,4})$')
+MDY_DATE_PATTERN = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})$')
+
+MALE_VALUES = frozenset({'M', 'MALE'})
+FEMALE_VALUES = frozenset({'F', 'FEMALE'})
+
+
+# Dates recur across documents (shared issue/expiration dates), so cache parsed results
+@functools.lru_cache(maxsize=4096)
+def _normalize_date_string(date_str):
+    # Filter out placeholder text like "MM/DD/YYYY or null"
+    if 'or' in date_str.lower() or date_str.upper() == 'MM/DD/YYYY' or date_str.upper() == 'DD/MM/YYYY':
+        return None
+
+    # Classify the shape once and validate ranges arithmetically instead of probing
+    # strptime formats, where every miss raises an exception
+    match = DATE_PATTERN.match(date_str)
+    if not match:
+        return None
+    first, _, middle, last = match.groups()
+
+    if len(first) == 4:
+        if len(middle) > 2 or len(last) > 2:
+            return None
+        candidates = [(int(first), int(middle), int(last))]
+    elif len(first) <= 2 and len(middle) <= 2 and len(last) in (2, 4):
+        year = int(last)
+        if len(last) == 2:
+            # Same two-digit year pivot as strptime's %y
+            year += 2000 if year < 69 else 1900
+        # Prefer month-first (US), fall back to day-first
+        candidates = [(year, int(first), int(middle)), (year, int(middle), int(first))]
+    else:
+        return None
+
+    for year, month, day in candidates:
+        if _is_valid_ymd(year, month, day):
+            if year < 100:
+                year = year + 2000 if year < 50 else year + 1900
+            return f"{month:02d}/{day:02d}/{year:04d}"
+
+    return None
+
+
+def _is_valid_ymd(year, month, day):
+    return year >= 1 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+
+
+@functools.lru_cache(maxsize=256)
+def _normalize_sex_string(sex_str):
+    # Filter out placeholder text like "M OR F OR NULL"
+    if 'OR' in sex_str or 'NULL' in sex_str:
+        return None
+    if sex_str in MALE_VALUES:
+        return 'M'
+    elif sex_str in FEMALE_VALUES:
+        return 'F'
+    return None
+
+
 class LicenseExtractor:
     REQUIRED_FIELDS = ['first_name', 'last_name', 'dln', 'date_of_birth', 'expiration_date']
     OPTIONAL_FIELDS = ['street_address', 'city', 'state', 'zip_code', 'sex']
+    REQUIRED_FIELD_SET = frozenset(REQUIRED_FIELDS)
 
     STATE_ABBREVIATIONS = [
         'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
@@ -17,25 +83,48 @@ class LicenseExtractor:
         'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
         'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
     ]
+    STATE_ABBREVIATION_SET = frozenset(STATE_ABBREVIATIONS)
+
+    # Field -> normalizer, in output order; bound once per instance
+    FIELD_NORMALIZERS = [
+        ('first_name', '_normalize_name'),
+        ('last_name', '_normalize_name'),
+        ('dln', '_normalize_license_number'),
+        ('date_of_birth', '_normalize_date'),
+        ('expiration_date', '_normalize_date'),
+        ('street_address', '_normalize_address'),
+        ('city', '_normalize_city'),
+        ('state', '_normalize_state'),
+        ('zip_code', '_normalize_zip'),
+        ('sex', '_normalize_sex'),
+    ]
+
+    # Field -> value check run on non-empty values; fields without an entry need no check
+    VALUE_CHECKS = {
+        'date_of_birth': '_check_date_value',
+        'expiration_date': '_check_date_value',
+        'state': '_check_state_value',
+        'sex': '_check_sex_value',
+    }
 
     def __init__(self):
-        pass
+        self._field_normalizers = [(field, getattr(self, name)) for field, name in self.FIELD_NORMALIZERS]
+        self._value_checks = {field: getattr(self, name) for field, name in self.VALUE_CHECKS.items()}
 
     def validate_and_normalize(self, extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: normalize(extracted_data.get(field)) for field, normalize in self._field_normalizers}
+
+    def normalize_and_validate(self, extracted_data: Dict[str, Any]):
+        # Single pass over the fields: normalize each value and validate it in place
         normalized = {}
+        validation_report = self._empty_validation_report()
 
-        normalized['first_name'] = self._normalize_name(extracted_data.get('first_name'))
-        normalized['last_name'] = self._normalize_name(extracted_data.get('last_name'))
-        normalized['dln'] = self._normalize_license_number(extracted_data.get('dln'))
-        normalized['date_of_birth'] = self._normalize_date(extracted_data.get('date_of_birth'))
-        normalized['expiration_date'] = self._normalize_date(extracted_data.get('expiration_date'))
-        normalized['street_address'] = self._normalize_address(extracted_data.get('street_address'))
-        normalized['city'] = self._normalize_city(extracted_data.get('city'))
-        normalized['state'] = self._normalize_state(extracted_data.get('state'))
-        normalized['zip_code'] = self._normalize_zip(extracted_data.get('zip_code'))
-        normalized['sex'] = self._normalize_sex(extracted_data.get('sex'))
+        for field, normalize in self._field_normalizers:
+            value = normalize(extracted_data.get(field))
+            normalized[field] = value
+            self._validate_field(field, value, validation_report)
 
-        return normalized
+        return normalized, validation_report
 
     def _normalize_name(self, name):
         if not name or name == 'null':
@@ -43,7 +132,8 @@ class LicenseExtractor:
         name_str = str(name).strip()
         # Filter out placeholder text
         placeholder_keywords = ['string', 'null', 'or', 'name']
-        if any(keyword in name_str.lower() for keyword in placeholder_keywords) and len(name_str.split()) > 2:
+        name_lower = name_str.lower()
+        if any(keyword in name_lower for keyword in placeholder_keywords) and len(name_str.split()) > 2:
             return None
         return name_str.title()
 
@@ -52,49 +142,29 @@ class LicenseExtractor:
             return None
         license_str = str(license_num).strip()
         # Filter out placeholder text
-        if 'string' in license_str.lower() or 'or' in license_str.lower():
+        license_lower = license_str.lower()
+        if 'string' in license_lower or 'or' in license_lower:
             return None
 
         # Remove common license number label prefixes
         # Examples: "4d DLN S123-456-789", "DL# 12345", "LIC# 12345"
-        license_str = re.sub(r'^(4d\s*DLN|DL#?|LIC#?|LICENSE#?)\s*', '', license_str, flags=re.IGNORECASE)
+        license_str = LICENSE_PREFIX_PATTERN.sub('', license_str)
 
-        # Remove spaces and convert to uppercase
-        return re.sub(r'\s+', '', license_str.upper())
+        # Remove spaces and convert to uppercase (split/join stays in C, no regex engine)
+        return ''.join(license_str.upper().split())
 
     def _normalize_date(self, date_str):
         if not date_str or date_str == 'null':
             return None
-
-        date_str = str(date_str).strip()
-
-        # Filter out placeholder text like "MM/DD/YYYY or null"
-        if 'or' in date_str.lower() or date_str.upper() == 'MM/DD/YYYY' or date_str.upper() == 'DD/MM/YYYY':
-            return None
-
-        formats = [
-            '%m/%d/%Y', '%m-%d-%Y', '%Y-%m-%d', '%Y/%m/%d',
-            '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%y', '%m-%d-%y',
-            '%d/%m/%y', '%d-%m-%y'
-        ]
-
-        for fmt in formats:
-            try:
-                dt = datetime.datetime.strptime(date_str, fmt)
-                if dt.year < 100:
-                    dt = dt.replace(year=dt.year + 2000 if dt.year < 50 else dt.year + 1900)
-                return dt.strftime('%m/%d/%Y')
-            except ValueError:
-                continue
-
-        return None
+        return _normalize_date_string(str(date_str).strip())
 
     def _normalize_address(self, address):
         if not address or address == 'null':
             return None
         address_str = str(address).strip()
         # Filter out placeholder text
-        if 'string' in address_str.lower() or 'or null' in address_str.lower():
+        address_lower = address_str.lower()
+        if 'string' in address_lower or 'or null' in address_lower:
             return None
         return address_str
 
@@ -103,7 +173,8 @@ class LicenseExtractor:
             return None
         city_str = str(city).strip()
         # Filter out placeholder text
-        if 'string' in city_str.lower() or 'or null' in city_str.lower():
+        city_lower = city_str.lower()
+        if 'string' in city_lower or 'or null' in city_lower:
             return None
         return city_str.title()
 
@@ -114,7 +185,7 @@ class LicenseExtractor:
         # Filter out placeholder text
         if 'LETTER' in state_str or 'CODE' in state_str or 'OR' in state_str:
             return None
-        if state_str in self.STATE_ABBREVIATIONS:
+        if state_str in self.STATE_ABBREVIATION_SET:
             return state_str
         return None
 
@@ -123,9 +194,10 @@ class LicenseExtractor:
             return None
         zip_str = str(zip_code).strip()
         # Filter out placeholder text
-        if 'string' in zip_str.lower() or 'or null' in zip_str.lower():
+        zip_lower = zip_str.lower()
+        if 'string' in zip_lower or 'or null' in zip_lower:
             return None
-        zip_match = re.match(r'(\d{5})(?:-?(\d{4}))?', zip_str)
+        zip_match = ZIP_PATTERN.match(zip_str)
         if zip_match:
             if zip_match.group(2):
                 return f"{zip_match.group(1)}-{zip_match.group(2)}"
@@ -135,65 +207,59 @@ class LicenseExtractor:
     def _normalize_sex(self, sex):
         if not sex or sex == 'null':
             return None
-        sex_str = str(sex).strip().upper()
-        # Filter out placeholder text like "M OR F OR NULL"
-        if 'OR' in sex_str or 'NULL' in sex_str:
-            return None
-        if sex_str in ['M', 'MALE']:
-            return 'M'
-        elif sex_str in ['F', 'FEMALE']:
-            return 'F'
-        return None
+        return _normalize_sex_string(str(sex).strip().upper())
 
     def validate_data(self, normalized_data: Dict[str, Any]) -> Dict[str, List]:
-        validation_report = {
+        validation_report = self._empty_validation_report()
+
+        for field, _ in self.FIELD_NORMALIZERS:
+            self._validate_field(field, normalized_data.get(field), validation_report)
+
+        return validation_report
+
+    def _empty_validation_report(self):
+        return {
             'missing_fields': [],
             'format_errors': [],
             'invalid_values': []
         }
 
-        for field in self.REQUIRED_FIELDS:
-            value = normalized_data.get(field)
-            if not value or value == 'null':
-                validation_report['missing_fields'].append(field)
-
-        if normalized_data.get('date_of_birth'):
-            if not self._is_valid_date_format(normalized_data['date_of_birth']):
-                validation_report['format_errors'].append({
-                    'field': 'date_of_birth',
-                    'value': normalized_data['date_of_birth'],
-                    'error': 'Invalid date format'
-                })
-
-        if normalized_data.get('expiration_date'):
-            if not self._is_valid_date_format(normalized_data['expiration_date']):
-                validation_report['format_errors'].append({
-                    'field': 'expiration_date',
-                    'value': normalized_data['expiration_date'],
-                    'error': 'Invalid date format'
-                })
-
-        if normalized_data.get('state'):
-            if normalized_data['state'] not in self.STATE_ABBREVIATIONS:
-                validation_report['invalid_values'].append({
-                    'field': 'state',
-                    'value': normalized_data['state'],
-                    'error': 'Invalid state abbreviation'
-                })
-
-        if normalized_data.get('sex'):
-            if normalized_data['sex'] not in ['M', 'F']:
-                validation_report['invalid_values'].append({
-                    'field': 'sex',
-                    'value': normalized_data['sex'],
-                    'error': 'Sex must be M or F'
-                })
+    def _validate_field(self, field, value, validation_report):
+        if (not value or value == 'null') and field in self.REQUIRED_FIELD_SET:
+            validation_report['missing_fields'].append(field)
+        if not value:
+            return
 
-        return validation_report
+        check = self._value_checks.get(field)
+        if check:
+            check(field, value, validation_report)
+
+    def _check_date_value(self, field, value, validation_report):
+        if not self._is_valid_date_format(value):
+            validation_report['format_errors'].append({
+                'field': field,
+                'value': value,
+                'error': 'Invalid date format'
+            })
+
+    def _check_state_value(self, field, value, validation_report):
+        if value not in self.STATE_ABBREVIATION_SET:
+            validation_report['invalid_values'].append({
+                'field': field,
+                'value': value,
+                'error': 'Invalid state abbreviation'
+            })
+
+    def _check_sex_value(self, field, value, validation_report):
+        if value not in ['M', 'F']:
+            validation_report['invalid_values'].append({
+                'field': field,
+                'value': value,
+                'error': 'Sex must be M or F'
+            })
 
     def _is_valid_date_format(self, date_str):
-        try:
-            datetime.datetime.strptime(date_str, '%m/%d/%Y')
-            return True
-        except ValueError:
+        match = MDY_DATE_PATTERN.match(date_str)
+        if not match:
             return False
+        return _is_valid_ymd(int(match.group(3)), int(match.group(1)), int(match.group(2)))
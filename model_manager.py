@@ -1,12 +1,25 @@
-import torch
+import os
+import re
+import json
 import gc
 import logging
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Allocator settings are read when torch initializes the device, so set them before importing it.
+# Expandable segments let the CUDA caching allocator grow in place across the Surya -> LLAMA
+# unload/reload cycle instead of fragmenting; the MPS ratio lifts the cap on cached memory
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:128")
+os.environ.setdefault("PYTORCH_MPS_HIGH_WATERMARK_RATIO", "0.0")
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, DynamicCache, StaticCache
 from surya.ocr import run_ocr
 from surya.model.detection.model import load_model as load_det_model, load_processor as load_det_processor
 from surya.model.recognition.model import load_model as load_rec_model
 from surya.model.recognition.processor import load_processor as load_rec_processor
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,7 +30,7 @@ try:
     if platform.processor() == 'arm' or 'Apple' in platform.processor():
         QUANTIZATION_AVAILABLE = False
         logger.warning("M1/M2 Mac detected - bitsandbytes not supported on Apple Silicon")
-        logger.warning("Using standard model loading with optimizations")
+        logger.warning("Install mps-bitsandbytes for 4-bit quantization, otherwise using standard model loading")
     else:
         QUANTIZATION_AVAILABLE = True
         logger.info("4-bit quantization available (bitsandbytes detected)")
@@ -25,6 +38,99 @@ except ImportError:
     QUANTIZATION_AVAILABLE = False
     logger.warning("bitsandbytes not available - using standard model loading (will use more memory)")
 
+try:
+    import mps_bitsandbytes
+    MPS_QUANTIZATION_AVAILABLE = True
+    logger.info("4-bit quantization available on Apple Silicon (mps-bitsandbytes detected)")
+except ImportError:
+    MPS_QUANTIZATION_AVAILABLE = False
+
+try:
+    from mlx_lm import load as mlx_load, generate as mlx_generate
+    MLX_AVAILABLE = True
+    logger.info("MLX available - LLAMA will run natively on Apple Silicon")
+except ImportError:
+    MLX_AVAILABLE = False
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    logger.warning("OpenCV not available - using Pillow to resize OCR input images")
+
+CUDA_EXPANDABLE_SEGMENTS = "expandable_segments:True" in os.environ["PYTORCH_CUDA_ALLOC_CONF"]
+# Share of a CUDA device this process may claim, leaving headroom for other processes
+CUDA_MEMORY_FRACTION = 0.8
+
+# Fraction of driver-reserved memory in use above which the allocator cache is released
+MEMORY_PRESSURE_RATIO = 0.6
+
+# Longest side (px) images are downscaled to before OCR
+OCR_MAX_DIMENSION = 2000
+# Images per Surya call; bounds peak device residency for multi-page documents
+OCR_CHUNK_SIZE = 8
+# Number of OCR text -> extracted fields results kept in memory
+EXTRACTION_CACHE_SIZE = 256
+
+# Prompts generated per LLAMA forward pass
+LLAMA_MAX_BATCH = 4
+LLAMA_MAX_INPUT_TOKENS = 1024
+# A complete license record is ~120 tokens
+LLAMA_MAX_NEW_TOKENS = 256
+
+# Compile the transformers LLAMA forward pass with torch.compile. Off by default: the backend
+# unloads LLAMA after every request and the model is compiled at most once per process, so
+# this only pays off where the model stays loaded (e.g. test_llama_direct.py --n)
+COMPILE_LLAMA = False
+
+LLAMA_MODEL_ID = "meta-llama/Llama-3.2-1B-Instruct"
+# Pre-quantized 4-bit conversion of the same model for the MLX backend
+MLX_LLAMA_MODEL_ID = "mlx-community/Llama-3.2-1B-Instruct-4bit"
+
+# OCR characters included in the extraction prompt
+PROMPT_OCR_MAX_CHARS = 1500
+
+# Static parts of the LLAMA extraction prompt; the OCR text goes between them
+EXTRACTION_PROMPT_PREFIX = """<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+Extract data from driver's license OCR text and return JSON.<|eot_id|><|start_header_id|>user<|end_header_id|>
+OCR text from driver's license:
+
+"""
+EXTRACTION_PROMPT_SUFFIX = """
+
+Find these values in the text above:
+- First name (look for "1" label, extract the name after it)
+- Last name (look for "2" label, extract all words after it - may be multiple words)
+- DLN (look for "4d DLN" label, extract only the number after it)
+- Birth date (look for "3 DOB" label, format MM/DD/YYYY)
+- Expiration date (look for "4b EXP" or "4bEXP" label, format MM/DD/YYYY)
+- Street address (look for "8" label)
+- City (city name before state)
+- State (2-letter code like KY)
+- Zip code (5 digits)
+- Sex (look for "15 SEX" label - carefully extract M or F)
+
+Return one flat JSON object with exactly these keys: first_name, last_name, dln, date_of_birth, expiration_date, street_address, city, state, zip_code, sex. Use null for any value not found in the OCR text.<|eot_id|><|start_header_id|>assistant<|end_header_id|>
+{"""
+
+LICENSE_FIELDS = (
+    'first_name', 'last_name', 'dln', 'date_of_birth', 'expiration_date',
+    'street_address', 'city', 'state', 'zip_code', 'sex'
+)
+# Top-level keys that indicate the model returned a nested record
+NESTED_STRUCTURE_KEYS = frozenset({'name', 'driver_info', 'address'})
+TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+PLACEHOLDER_PATTERN = re.compile(r'\b(?:string|null)\b', re.IGNORECASE)
+
+# Field patterns used to cross-check LLAMA output against the raw OCR text
+FALLBACK_SEX_PATTERN = re.compile(r'15\s*SEX\s+([MF])', re.IGNORECASE)
+FALLBACK_DLN_PATTERN = re.compile(r'4d\s*DLN\s+([A-Z0-9-]+)', re.IGNORECASE)
+FALLBACK_LAST_NAME_PATTERN = re.compile(r'2\s+([A-Z][A-Z\s]+?)(?:\n|3\s|$)')
+FALLBACK_DOB_PATTERN = re.compile(r'3\s*DOB\s+(\d{2}/\d{2}/\d{4})')
+FALLBACK_EXP_PATTERN = re.compile(r'4b\s*EXP\s+(\d{2}/\d{2}/\d{4})')
+
 class ModelManager:
     def __init__(self):
         self.surya_det_model = None
@@ -33,55 +139,157 @@ class ModelManager:
         self.surya_rec_processor = None
         self.llama_model = None
         self.llama_tokenizer = None
+        self._extraction_cache = OrderedDict()
+        self._extraction_cache_lock = threading.Lock()
+        self._kv_cache = None
+        self._kv_cache_batch_size = None
+        self._prompt_prefix_ids = None
+        self._prompt_suffix_ids = None
+        self._prefix_kv = None
+        # LLAMA is reloaded for every request; compiling each fresh instance would pay the
+        # compile cost again and eventually hit dynamo's recompile limit
+        self._llama_compile_attempted = False
+        # Kernel/graph compilation caches outlive a model unload, so warming up once is enough
+        self._surya_warmed_up = False
         self.device = "mps" if torch.backends.mps.is_available() else "cpu"
-        logger.info(f"Using device: {self.device}")
+        self._llama_backend = "mlx" if self.device == "mps" and MLX_AVAILABLE else "transformers"
+        logger.info(f"Using device: {self.device} (LLAMA backend: {self._llama_backend})")
+        self._cuda_memory_configured = False
+
+    def _configure_cuda_memory(self):
+        # Capping the memory fraction creates the CUDA context, so defer it to the first model
+        # load; processes that only import the backend (reloader parent, import checks) never pay it
+        if self._cuda_memory_configured:
+            return
+        self._cuda_memory_configured = True
+        if torch.cuda.is_available():
+            torch.cuda.set_per_process_memory_fraction(CUDA_MEMORY_FRACTION)
+
+    def clear_gpu_memory(self, force=False):
+        # Called on model unload, which is exactly when large cyclic garbage appears; collect it
+        # so the old model's tensors are really gone before the next model loads. A collection
+        # costs milliseconds next to a multi-second model load
+        gc.collect()
 
-    def clear_gpu_memory(self):
+        # empty_cache() serializes the device queue, so only release the allocator cache when
+        # it is actually under pressure (or on explicit shutdown)
         if self.device == "mps":
-            torch.mps.empty_cache()
+            allocated = torch.mps.current_allocated_memory()
+            reserved = torch.mps.driver_allocated_memory()
+            empty_cache = torch.mps.empty_cache
         elif torch.cuda.is_available():
-            torch.cuda.empty_cache()
-        gc.collect()
-        logger.info("Cleared GPU memory")
+            allocated = torch.cuda.memory_allocated()
+            reserved = torch.cuda.memory_reserved()
+            # An expandable pool is meant to be reused by the next model; only release it on shutdown
+            empty_cache = torch.cuda.empty_cache if force or not CUDA_EXPANDABLE_SEGMENTS else None
+        else:
+            allocated = reserved = 0
+            empty_cache = None
+
+        under_pressure = reserved > 0 and allocated > MEMORY_PRESSURE_RATIO * reserved
+        if empty_cache is not None and (force or under_pressure):
+            empty_cache()
+            logger.info(f"Cleared GPU memory (allocated={allocated / 1e9:.2f}GB, reserved={reserved / 1e9:.2f}GB)")
 
     def load_surya_models(self):
         if self.surya_det_model is None:
+            self._configure_cuda_memory()
             logger.info("Loading Surya detection model...")
             self.surya_det_model = load_det_model()
+            # Surya builds its pixel tensors internally, so put the conv weights in NHWC instead;
+            # the conv kernels then select the channels_last path for the whole detector
+            self.surya_det_model = self.surya_det_model.to(memory_format=torch.channels_last)
             self.surya_det_processor = load_det_processor()
             logger.info("Loading Surya recognition model...")
             self.surya_rec_model = load_rec_model()
             self.surya_rec_processor = load_rec_processor()
+            # self.device is "cpu" on CUDA hosts too, where Surya places its models on the GPU;
+            # only quantize when the weights actually live on the CPU
+            if next(self.surya_rec_model.parameters()).device.type == "cpu":
+                self._quantize_surya_models()
             logger.info("Surya models loaded successfully")
+            if not self._surya_warmed_up:
+                self._warmup_surya_models()
+                self._surya_warmed_up = True
         return self.surya_det_model, self.surya_det_processor, self.surya_rec_model, self.surya_rec_processor
 
-    def unload_surya_models(self):
+    def _quantize_surya_models(self):
+        # Dynamic int8 quantization only covers nn.Linear; the detector's convs stay FP32
+        logger.info("CPU device - quantizing Surya linear layers to int8")
+        try:
+            self.surya_rec_model = torch.ao.quantization.quantize_dynamic(
+                self.surya_rec_model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            self.surya_det_model = torch.ao.quantization.quantize_dynamic(
+                self.surya_det_model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        except Exception as e:
+            logger.warning(f"Surya int8 quantization failed, using FP32 models: {e}")
+
+    def _warmup_surya_models(self):
+        # The first batched pass pays for kernel/graph compilation; take that hit on a dummy page.
+        # It needs real text on it: detection finds no lines on a blank page, and then the
+        # recognition model never runs
+        logger.info("Warming up Surya models...")
+        dummy = Image.new("RGB", (800, 600), (255, 255, 255))
+        try:
+            font = ImageFont.load_default(size=40)
+        except TypeError:
+            # Pillow < 10.1 only has the small fixed-size bitmap font
+            font = ImageFont.load_default()
+        draw = ImageDraw.Draw(dummy)
+        for line_idx, line in enumerate(["1 JOHN", "2 DOE SMITH", "3 DOB 01/15/1985", "4d DLN D123-456-789"]):
+            draw.text((40, 60 + line_idx * 120), line, fill=(0, 0, 0), font=font)
+        try:
+            with torch.inference_mode():
+                run_ocr(
+                    [dummy],
+                    [["en"]],
+                    self.surya_det_model,
+                    self.surya_det_processor,
+                    self.surya_rec_model,
+                    self.surya_rec_processor
+                )
+        except Exception as e:
+            logger.warning(f"Surya warmup failed: {e}")
+
+    def unload_surya_models(self, force=False):
         logger.info("Unloading Surya models to free memory...")
         self.surya_det_model = None
         self.surya_det_processor = None
         self.surya_rec_model = None
         self.surya_rec_processor = None
-        self.clear_gpu_memory()
+        self.clear_gpu_memory(force=force)
 
     def load_llama_model(self):
         if self.llama_model is None:
-            model_id = "meta-llama/Llama-3.2-1B-Instruct"
+            self._configure_cuda_memory()
+            model_id = LLAMA_MODEL_ID
             logger.info(f"Loading LLAMA model: {model_id}")
             logger.info("Using 1B model - optimized for 8GB M1 Macs")
 
-            if QUANTIZATION_AVAILABLE:
+            if self._llama_backend == "mlx":
+                logger.info(f"Loading 4-bit MLX checkpoint: {MLX_LLAMA_MODEL_ID}")
+                self.llama_model, self.llama_tokenizer = mlx_load(MLX_LLAMA_MODEL_ID)
+                logger.info("LLAMA model loaded successfully")
+                return self.llama_model, self.llama_tokenizer
+            elif QUANTIZATION_AVAILABLE:
                 logger.info("Loading LLAMA 3.2 1B model with 4-bit quantization...")
                 logger.info("This reduces memory usage from 2GB to ~500MB")
 
                 if self.device == "mps":
                     logger.info("M1/M2 Mac detected - optimizing for 8GB RAM")
 
+                device_map = self._llama_device_map()
+                # CPU offload only makes sense when accelerate is allowed to spread layers
+                offload = device_map == "auto"
+
                 quantization_config = BitsAndBytesConfig(
                     load_in_4bit=True,
                     bnb_4bit_compute_dtype=torch.float16,
                     bnb_4bit_use_double_quant=True,
                     bnb_4bit_quant_type="nf4",
-                    llm_int8_enable_fp32_cpu_offload=True
+                    llm_int8_enable_fp32_cpu_offload=offload
                 )
 
                 self.llama_tokenizer = AutoTokenizer.from_pretrained(
@@ -94,10 +302,39 @@ class ModelManager:
                 self.llama_model = AutoModelForCausalLM.from_pretrained(
                     model_id,
                     quantization_config=quantization_config,
-                    device_map="auto",
+                    device_map=device_map,
+                    torch_dtype=torch.float16,
+                    low_cpu_mem_usage=True,
+                    max_memory={0: "5GB", "cpu": "3GB"} if offload else None
+                )
+                self._quantize_llama_embeddings()
+            elif self.device == "mps" and MPS_QUANTIZATION_AVAILABLE:
+                logger.info("Loading LLAMA 3.2 1B model with mps-bitsandbytes NF4 quantization...")
+                logger.info("This reduces memory usage from 2GB to ~500MB")
+
+                self.llama_tokenizer = AutoTokenizer.from_pretrained(
+                    model_id,
+                    use_fast=True
+                )
+                if self.llama_tokenizer.pad_token is None:
+                    self.llama_tokenizer.pad_token = self.llama_tokenizer.eos_token
+
+                # Load FP16 weights on the GPU, then swap linears for fused Metal NF4 kernels
+                model = AutoModelForCausalLM.from_pretrained(
+                    model_id,
                     torch_dtype=torch.float16,
                     low_cpu_mem_usage=True,
-                    max_memory={0: "5GB", "cpu": "3GB"}
+                    device_map=self._llama_device_map()
+                )
+                quantization_config = mps_bitsandbytes.BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=torch.float16
+                )
+                self.llama_model = mps_bitsandbytes.quantize_model(
+                    model,
+                    quantization_config=quantization_config,
+                    device="mps"
                 )
             else:
                 logger.info("Loading LLAMA 3.2 1B model with M1-optimized settings")
@@ -121,126 +358,379 @@ class ModelManager:
                     model_id,
                     torch_dtype=dtype,
                     low_cpu_mem_usage=True,
-                    device_map={"": self.device} if self.device == "mps" else "auto"
+                    device_map=self._llama_device_map()
                 )
 
+            self._compile_llama_model()
+
+            # Decoder-only batches must be left-padded so generation continues from real tokens
+            self.llama_tokenizer.padding_side = "left"
             logger.info("LLAMA model loaded successfully")
         return self.llama_model, self.llama_tokenizer
 
-    def unload_llama_model(self):
+    def _quantize_llama_embeddings(self):
+        # BitsAndBytesConfig only converts nn.Linear blocks; the (tied) token embedding and
+        # lm_head stay FP16 and are ~250MB of the 1B model, so swap them for 4-bit modules too
+        try:
+            from bitsandbytes.nn import Embedding4bit, Linear4bit
+        except ImportError:
+            logger.warning("bitsandbytes Embedding4bit unavailable - keeping FP16 embeddings")
+            return
+
+        try:
+            embed = self.llama_model.get_input_embeddings()
+            lm_head = self.llama_model.get_output_embeddings()
+            device = embed.weight.device
+
+            quantized_embed = Embedding4bit(
+                embed.num_embeddings,
+                embed.embedding_dim,
+                dtype=torch.float16,
+                quant_type="nf4"
+            )
+            quantized_embed.load_state_dict(embed.state_dict())
+
+            # A tied lm_head would keep the FP16 tensor alive, so it gets its own 4-bit copy
+            quantized_head = Linear4bit(
+                lm_head.in_features,
+                lm_head.out_features,
+                bias=lm_head.bias is not None,
+                compute_dtype=torch.float16,
+                quant_type="nf4"
+            )
+            quantized_head.load_state_dict(lm_head.state_dict())
+
+            self.llama_model.set_input_embeddings(quantized_embed.to(device))
+            self.llama_model.set_output_embeddings(quantized_head.to(device))
+            self.llama_model.config.tie_word_embeddings = False
+            logger.info("Quantized LLAMA embeddings and lm_head to 4-bit")
+        except Exception as e:
+            logger.warning(f"Could not quantize LLAMA embeddings, keeping FP16: {e}")
+
+    def _compile_llama_model(self):
+        if not COMPILE_LLAMA or not hasattr(torch, "compile"):
+            return
+        if self._llama_compile_attempted:
+            logger.info("LLAMA already compiled once in this process - running reloaded model eagerly")
+            return
+        self._llama_compile_attempted = True
+
+        # generate() calls forward() directly, so compile the bound method rather than wrapping
+        # the module. Decode steps have fixed shapes thanks to the StaticCache, so graphs are reused
+        if self.device == "mps":
+            # Inductor has no Metal backend; aot_eager still removes per-op Python dispatch
+            compile_kwargs = {"backend": "aot_eager"}
+        elif torch.cuda.is_available():
+            compile_kwargs = {"mode": "reduce-overhead"}
+        else:
+            compile_kwargs = {}
+
+        try:
+            self.llama_model.forward = torch.compile(self.llama_model.forward, **compile_kwargs)
+            # torch.compile is lazy; run one forward now so a backend failure (no C++ toolchain,
+            # unsupported 4-bit modules) falls back to eager here instead of failing a request
+            warmup_ids = self.llama_tokenizer("{", return_tensors="pt").input_ids.to(self.llama_model.device)
+            with torch.inference_mode():
+                self.llama_model(warmup_ids)
+            logger.info(f"Compiled LLAMA forward with torch.compile {compile_kwargs}")
+        except Exception as e:
+            self._restore_eager_llama_forward()
+            logger.warning(f"torch.compile unavailable for LLAMA, running eagerly: {e}")
+
+    def _restore_eager_llama_forward(self):
+        # The compiled forward is an instance attribute holding a bound method of the model, a
+        # reference cycle; dropping it restores the class forward and lets the model be freed
+        # by reference counting
+        if self.llama_model is not None and "forward" in vars(self.llama_model):
+            del self.llama_model.forward
+
+    def _llama_device_map(self):
+        # Keep every layer on one device when there is only one; accelerate's "auto" dispatcher
+        # would otherwise offload layers to CPU and copy activations every forward pass
+        if self.device == "mps":
+            return {"": "mps"}
+        if torch.cuda.device_count() == 1:
+            return {"": "cuda:0"}
+        return "auto"
+
+    def unload_llama_model(self, force=False):
         logger.info("Unloading LLAMA model to free memory...")
+        self._restore_eager_llama_forward()
         self.llama_model = None
         self.llama_tokenizer = None
-        self.clear_gpu_memory()
+        self._kv_cache = None
+        self._kv_cache_batch_size = None
+        self._prompt_prefix_ids = None
+        self._prompt_suffix_ids = None
+        self._prefix_kv = None
+        self.clear_gpu_memory(force=force)
+
+    def shutdown(self):
+        self.unload_surya_models(force=True)
+        self.unload_llama_model(force=True)
 
     def run_ocr(self, image_paths, languages=["en"]):
-        det_model, det_processor, rec_model, rec_processor = self.load_surya_models()
-
-        if any(x is None for x in [det_model, det_processor, rec_model, rec_processor]):
-            raise RuntimeError("One or more Surya models failed to load")
-
-        images = []
-        for img_path in image_paths:
-            img = Image.open(img_path).convert("RGB")
-            original_size = img.size
-            if img.width > 2000 or img.height > 2000:
-                ratio = min(2000/img.width, 2000/img.height)
-                new_size = (int(img.width * ratio), int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-                logger.info(f"Resized image from {original_size} to {img.size}")
-            images.append(img)
-
-        predictions = run_ocr(
-            images,
-            [languages] * len(images),
-            det_model,
-            det_processor,
-            rec_model,
-            rec_processor
-        )
+        chunks = [image_paths[i:i + OCR_CHUNK_SIZE] for i in range(0, len(image_paths), OCR_CHUNK_SIZE)]
+        predictions = []
+
+        with ThreadPoolExecutor(max_workers=min(OCR_CHUNK_SIZE, os.cpu_count() or 1)) as executor:
+            # Decode the first chunk while the models load, then always prefetch the next
+            # chunk while the current one is on the GPU
+            pending = [executor.submit(self._load_image, img_path) for img_path in chunks[0]] if chunks else []
+
+            det_model, det_processor, rec_model, rec_processor = self.load_surya_models()
+
+            if any(x is None for x in [det_model, det_processor, rec_model, rec_processor]):
+                raise RuntimeError("One or more Surya models failed to load")
+
+            for chunk_idx in range(len(chunks)):
+                images = [future.result() for future in pending]
+                if chunk_idx + 1 < len(chunks):
+                    pending = [executor.submit(self._load_image, img_path) for img_path in chunks[chunk_idx + 1]]
+
+                with torch.inference_mode():
+                    predictions.extend(run_ocr(
+                        images,
+                        [languages] * len(images),
+                        det_model,
+                        det_processor,
+                        rec_model,
+                        rec_processor
+                    ))
 
         return predictions
 
-    def extract_fields_with_llama(self, ocr_text):
+    def _load_image(self, img_path):
+        img = Image.open(img_path)
+        original_size = img.size
+        new_size = None
+        if img.width > OCR_MAX_DIMENSION or img.height > OCR_MAX_DIMENSION:
+            ratio = min(OCR_MAX_DIMENSION/img.width, OCR_MAX_DIMENSION/img.height)
+            new_size = (int(img.width * ratio), int(img.height * ratio))
+            # For JPEGs, let libjpeg DCT-downscale during decode (never below new_size);
+            # a no-op for other formats
+            img.draft("RGB", new_size)
+        img = img.convert("RGB")
+
+        if new_size is not None and img.size != new_size:
+            if OPENCV_AVAILABLE:
+                # OpenCV's area resampling is SIMD-vectorized and well suited to large downscales
+                img = Image.fromarray(cv2.resize(np.asarray(img), new_size, interpolation=cv2.INTER_AREA))
+            else:
+                img = img.resize(new_size, Image.Resampling.BILINEAR)
+            logger.info(f"Resized image from {original_size} to {img.size}")
+
+        return img
+
+    def extract_fields_with_llama(self, ocr_text, use_cache=True):
+        return self.extract_fields_with_llama_batch([ocr_text], use_cache=use_cache)[0]
+
+    def extract_fields_with_llama_batch(self, ocr_texts, use_cache=True):
+        if not use_cache:
+            # Always run the model, e.g. to measure generation throughput
+            return self._run_llama_extraction(ocr_texts)
+
+        # Decoding is greedy, so the same OCR text always yields the same fields; re-submitted
+        # documents are answered from the cache without touching the model
+        results = [self._get_cached_extraction(ocr_text) for ocr_text in ocr_texts]
+        pending = [idx for idx, result in enumerate(results) if result is None]
+
+        if pending:
+            extracted = self._run_llama_extraction([ocr_texts[idx] for idx in pending])
+            for idx, extracted_data in zip(pending, extracted):
+                self._cache_extraction(ocr_texts[idx], extracted_data)
+                results[idx] = extracted_data
+
+        return results
+
+    def _get_cached_extraction(self, ocr_text):
+        with self._extraction_cache_lock:
+            extracted_data = self._extraction_cache.get(ocr_text)
+            if extracted_data is None:
+                return None
+            self._extraction_cache.move_to_end(ocr_text)
+        logger.info("Using cached LLAMA extraction for identical OCR text")
+        # Callers may modify the result, so never hand out the cached dict itself
+        return dict(extracted_data)
+
+    def _cache_extraction(self, ocr_text, extracted_data):
+        with self._extraction_cache_lock:
+            self._extraction_cache[ocr_text] = dict(extracted_data)
+            if len(self._extraction_cache) > EXTRACTION_CACHE_SIZE:
+                self._extraction_cache.popitem(last=False)
+
+    def _run_llama_extraction(self, ocr_texts):
         model, tokenizer = self.load_llama_model()
 
         if model is None or tokenizer is None:
             raise RuntimeError("LLAMA model or tokenizer failed to load")
 
-        prompt = self._build_extraction_prompt(ocr_text)
+        if self._llama_backend == "mlx":
+            return [self._extract_fields_with_mlx(ocr_text) for ocr_text in ocr_texts]
 
-        inputs = tokenizer(prompt, return_tensors="pt", padding=True, truncation=True, max_length=1024)
+        results = []
+        for start in range(0, len(ocr_texts), LLAMA_MAX_BATCH):
+            batch = ocr_texts[start:start + LLAMA_MAX_BATCH]
+            inputs = self._tokenize_prompts(batch)
+            if model.device.type == "mps":
+                # MPS handles int64 poorly; only the embedding lookup needs LongTensor ids,
+                # so ship the mask at half the width
+                inputs["attention_mask"] = inputs["attention_mask"].to(torch.int32)
+            inputs = {k: v.to(model.device) for k, v in inputs.items()}
+
+            with torch.inference_mode():
+                outputs = model.generate(
+                    **inputs,
+                    past_key_values=self._get_prefilled_kv_cache(len(batch)),
+                    max_new_tokens=LLAMA_MAX_NEW_TOKENS,
+                    do_sample=False,
+                    num_beams=1,
+                    repetition_penalty=1.1,
+                    pad_token_id=tokenizer.eos_token_id,
+                    eos_token_id=tokenizer.eos_token_id,
+                    # The record is a single flat object, so generation is done at its closing brace
+                    stop_strings=["}"],
+                    tokenizer=tokenizer
+                )
+                # Decoding is CPU work; bring all generated ids over in one transfer
+                outputs = outputs.cpu()
 
-        if self.device == "mps":
-            inputs = {k: v.to("mps") for k, v in inputs.items()}
-
-        with torch.no_grad():
-            outputs = model.generate(
-                **inputs,
-                max_new_tokens=700,
-                temperature=0.05,
-                do_sample=True,
-                top_p=0.95,
-                top_k=50,
-                repetition_penalty=1.1,
-                pad_token_id=tokenizer.eos_token_id,
-                eos_token_id=tokenizer.eos_token_id
-            )
+            # Decode only the generated tokens: the prompt echoes the OCR text, where a stray
+            # brace would throw off the JSON block scan
+            prompt_len = inputs["input_ids"].shape[1]
+            for ocr_text, output in zip(batch, outputs):
+                response = self._restore_opening_brace(tokenizer.decode(output[prompt_len:], skip_special_tokens=True))
 
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
+                extracted_data = self._parse_llama_response(response)
 
-        extracted_data = self._parse_llama_response(response)
+                # Apply fallback extraction for validation
+                extracted_data = self._apply_fallback_extraction(ocr_text, extracted_data)
 
-        # Apply fallback extraction for validation
-        extracted_data = self._apply_fallback_extraction(ocr_text, extracted_data)
+                results.append(extracted_data)
 
-        return extracted_data
+        return results
 
-    def _build_extraction_prompt(self, ocr_text):
-        ocr_text_trimmed = ocr_text[:1500] if len(ocr_text) > 1500 else ocr_text
+    def _extract_fields_with_mlx(self, ocr_text):
+        prompt = self._build_extraction_prompt(ocr_text)
 
-        # Log the OCR text being sent to the model
-        logger.info(f"Building prompt with OCR text: {ocr_text_trimmed[:200]}...")
+        # mlx_lm decodes greedily by default and returns only the completion
+        completion = mlx_generate(
+            self.llama_model,
+            self.llama_tokenizer,
+            prompt=prompt,
+            max_tokens=LLAMA_MAX_NEW_TOKENS
+        )
 
-        return f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
-Extract data from driver's license OCR text and return JSON.<|eot_id|><|start_header_id|>user<|end_header_id|>
-OCR text from driver's license:
+        extracted_data = self._parse_llama_response(self._restore_opening_brace(completion))
 
-{ocr_text_trimmed}
+        # Apply fallback extraction for validation
+        return self._apply_fallback_extraction(ocr_text, extracted_data)
+
+    def _restore_opening_brace(self, completion):
+        # The prompt ends with the opening brace, so the completion normally continues the
+        # object. If the model opens its own object instead, an extra brace would never be
+        # closed (generation stops at the first '}') and the block scan would find nothing
+        if completion.lstrip().startswith("{"):
+            return completion
+        return "{" + completion
+
+    def _get_kv_cache(self, batch_size):
+        # A preallocated KV buffer reused across generate() calls so the allocator does not
+        # regrow a dynamic cache for every document. Only the most recent one is kept: a
+        # 1280-token cache per batch size 1..LLAMA_MAX_BATCH would hold ~400MB at once
+        if len(set(getattr(self.llama_model, "hf_device_map", {}).values())) > 1:
+            # Layers are spread across devices; let generate() manage a dynamic cache
+            return None
+
+        if self._kv_cache is not None and self._kv_cache_batch_size == batch_size:
+            self._kv_cache.reset()
+            return self._kv_cache
+
+        # Drop the old buffer before allocating its replacement so both are never resident
+        self._kv_cache = None
+        cache = StaticCache(
+            config=self.llama_model.config,
+            max_batch_size=batch_size,
+            max_cache_len=LLAMA_MAX_INPUT_TOKENS + LLAMA_MAX_NEW_TOKENS,
+            device=self.llama_model.device,
+            dtype=self.llama_model.dtype
+        )
+        self._kv_cache = cache
+        self._kv_cache_batch_size = batch_size
+        return cache
 
-Find these values in the text above:
-- First name (look for "1" label, extract the name after it)
-- Last name (look for "2" label, extract all words after it - may be multiple words)
-- DLN (look for "4d DLN" label, extract only the number after it)
-- Birth date (look for "3 DOB" label, format MM/DD/YYYY)
-- Expiration date (look for "4b EXP" or "4bEXP" label, format MM/DD/YYYY)
-- Street address (look for "8" label)
-- City (city name before state)
-- State (2-letter code like KY)
-- Zip code (5 digits)
-- Sex (look for "15 SEX" label - carefully extract M or F)
+    def _build_extraction_prompt(self, ocr_text):
+        return EXTRACTION_PROMPT_PREFIX + self._trim_ocr_text(ocr_text) + EXTRACTION_PROMPT_SUFFIX
 
-Return JSON with this exact structure:
-{{
-  "first_name": null,
-  "last_name": null,
-  "dln": null,
-  "date_of_birth": null,
-  "expiration_date": null,
-  "street_address": null,
-  "city": null,
-  "state": null,
-  "zip_code": null,
-  "sex": null
-}}
-
-Replace null with actual values from the OCR text. Keep the exact same JSON structure.<|eot_id|><|start_header_id|>assistant<|end_header_id|>
-{{"""
+    def _trim_ocr_text(self, ocr_text):
+        # Slicing past the end is a no-op, so no length check is needed
+        ocr_text_trimmed = ocr_text[:PROMPT_OCR_MAX_CHARS]
 
-    def _parse_llama_response(self, response):
-        import json
-        import re
+        # Log the OCR text being sent to the model
+        logger.info(f"Building prompt with OCR text: {ocr_text_trimmed[:200]}...")
+
+        return ocr_text_trimmed
+
+    def _tokenize_prompts(self, ocr_texts):
+        tokenizer = self.llama_tokenizer
+
+        # The instruction text is identical for every document; encode it once per loaded tokenizer
+        if self._prompt_prefix_ids is None:
+            self._prompt_prefix_ids = tokenizer(EXTRACTION_PROMPT_PREFIX, add_special_tokens=False).input_ids
+            self._prompt_suffix_ids = tokenizer(EXTRACTION_PROMPT_SUFFIX, add_special_tokens=False).input_ids
+
+        # Truncate only the OCR body so the instructions and the assistant header always survive
+        body_budget = LLAMA_MAX_INPUT_TOKENS - len(self._prompt_prefix_ids) - len(self._prompt_suffix_ids)
+        bodies = tokenizer([self._trim_ocr_text(ocr_text) for ocr_text in ocr_texts], add_special_tokens=False).input_ids
+        sequences = [body[:body_budget] + self._prompt_suffix_ids for body in bodies]
+
+        # Pad between the shared prefix and the per-document tokens, so the prefix sits at
+        # the same positions in every row and its cached KV can be reused as-is
+        prefix_len = len(self._prompt_prefix_ids)
+        width = max(len(seq) for seq in sequences)
+        padding = [tokenizer.pad_token_id] * width
+        input_ids = torch.tensor([
+            self._prompt_prefix_ids + padding[:width - len(seq)] + seq for seq in sequences
+        ])
+        attention_mask = torch.tensor([
+            [1] * prefix_len + [0] * (width - len(seq)) + [1] * len(seq) for seq in sequences
+        ])
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+    def _get_prefix_kv(self):
+        # Attention keys/values for the instruction prefix are identical for every document,
+        # so run the prefix through the model once and seed each generate() call with it
+        if self._prefix_kv is None:
+            prefix_ids = torch.tensor([self._prompt_prefix_ids], device=self.llama_model.device)
+            prefix_kv = self.llama_model(
+                prefix_ids,
+                past_key_values=DynamicCache(),
+                use_cache=True
+            ).past_key_values
+            # With a compiled forward in reduce-overhead mode these are CUDA-graph output buffers
+            # that later replays overwrite, so keep a private copy
+            prefix_kv.key_cache = [keys.clone() for keys in prefix_kv.key_cache]
+            prefix_kv.value_cache = [values.clone() for values in prefix_kv.value_cache]
+            self._prefix_kv = prefix_kv
+        return self._prefix_kv
+
+    def _get_prefilled_kv_cache(self, batch_size):
+        prefix = self._get_prefix_kv()
+        cache = self._get_kv_cache(batch_size)
+
+        if cache is None:
+            return DynamicCache.from_legacy_cache(tuple(
+                (keys.expand(batch_size, -1, -1, -1).contiguous(), values.expand(batch_size, -1, -1, -1).contiguous())
+                for keys, values in zip(prefix.key_cache, prefix.value_cache)
+            ))
+
+        prefix_len = len(self._prompt_prefix_ids)
+        for layer_idx, (keys, values) in enumerate(zip(prefix.key_cache, prefix.value_cache)):
+            cache.key_cache[layer_idx][:, :, :prefix_len].copy_(keys)
+            cache.value_cache[layer_idx][:, :, :prefix_len].copy_(values)
+        return cache
 
+    def _parse_llama_response(self, response):
         logger.info(f"LLAMA raw response length: {len(response)} characters")
         logger.info(f"LLAMA response preview: {response[:200]}...")
 
@@ -256,8 +746,7 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
 
         # Find ALL JSON objects in the response
         # The model may output the template first, then the actual data
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        all_json_matches = re.findall(json_pattern, response, re.DOTALL)
+        all_json_matches = list(self._iter_json_blocks(response))
 
         logger.info(f"Found {len(all_json_matches)} potential JSON blocks")
 
@@ -266,8 +755,7 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
         for idx, json_str in enumerate(all_json_matches):
             # Clean up the JSON string
             json_str = json_str.strip()
-            json_str = re.sub(r',\s*}', '}', json_str)  # Remove trailing commas
-            json_str = re.sub(r',\s*]', ']', json_str)  # Remove trailing commas in arrays
+            json_str = TRAILING_COMMA_PATTERN.sub(r'\1', json_str)  # Remove trailing commas
 
             logger.info(f"Attempting to parse JSON block {idx+1}: {json_str[:150]}...")
 
@@ -292,54 +780,13 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
             logger.info(f"Validating block {idx+1} with {non_null_count} non-null fields")
             logger.info(f"Extracted fields: {list(data.keys())}")
 
-            # Validate JSON structure - must be flat with expected field names
-            expected_fields = {'first_name', 'last_name', 'dln', 'date_of_birth',
-                             'expiration_date', 'street_address', 'city', 'state', 'zip_code', 'sex'}
-            actual_fields = set(data.keys())
-
-            # Check if structure is wrong (nested objects instead of flat)
-            if 'name' in data or 'driver_info' in data or 'address' in data:
-                logger.warning("Model returned nested JSON structure instead of flat structure!")
-                logger.warning(f"Wrong structure detected: {list(data.keys())}")
-                continue
-
-            # Check if any field is a dict/list (should all be strings or null)
-            has_nested = False
-            for field, value in data.items():
-                if value is not None and not isinstance(value, (str, int, float)):
-                    logger.warning(f"Field '{field}' has nested structure (type: {type(value)}), expecting flat string!")
-                    has_nested = True
-                    break
-            if has_nested:
+            rejection = self._candidate_rejection(data)
+            if rejection:
+                logger.warning(f"Rejecting block {idx+1}: {rejection}")
                 continue
 
-            # Validate that we have actual data, not placeholder text or example data
-            if data.get('first_name') and isinstance(data['first_name'], str):
-                first_name_lower = data['first_name'].lower()
-                if 'string' in first_name_lower or 'null' in first_name_lower:
-                    logger.warning("Model returned placeholder text instead of actual data!")
-                    continue
-                if '<extract' in first_name_lower or 'extract from' in first_name_lower:
-                    logger.warning("Model returned template placeholder instead of extracting!")
-                    continue
-                # Check if model returned the example data instead of extracting from OCR
-                if first_name_lower == 'john' and data.get('last_name', '').lower() == 'smith':
-                    logger.warning("Model returned example data (John Smith) instead of extracting from OCR text!")
-                    continue
-
             # Ensure all expected fields exist
-            default_structure = {
-                "first_name": None,
-                "last_name": None,
-                "dln": None,
-                "date_of_birth": None,
-                "expiration_date": None,
-                "street_address": None,
-                "city": None,
-                "state": None,
-                "zip_code": None,
-                "sex": None
-            }
+            default_structure = dict.fromkeys(LICENSE_FIELDS)
             default_structure.update(data)
 
             logger.info(f"✓ Using block {idx+1} with {non_null_count} non-null values")
@@ -348,30 +795,65 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
         logger.error("✗ Failed to parse valid JSON from LLAMA response after all attempts")
         logger.error(f"Full response: {response}")
 
-        return {
-            "first_name": None,
-            "last_name": None,
-            "dln": None,
-            "date_of_birth": None,
-            "expiration_date": None,
-            "street_address": None,
-            "city": None,
-            "state": None,
-            "zip_code": None,
-            "sex": None
-        }
+        return dict.fromkeys(LICENSE_FIELDS)
+
+    def _iter_json_blocks(self, response):
+        """Yield each balanced top-level {...} block, skipping over any unmatched opening brace"""
+        depth = 0
+        start = None
+        in_string = False
+        escaped = False
+        for i, char in enumerate(response):
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = depth > 0
+            elif char == '{':
+                if depth == 0:
+                    start = i
+                depth += 1
+            elif char == '}' and depth > 0:
+                depth -= 1
+                if depth == 0:
+                    yield response[start:i + 1]
+
+        if depth > 0:
+            # An unmatched '{' swallowed the rest of the text; rescan after it so a complete
+            # object inside is still found
+            yield from self._iter_json_blocks(response[start + 1:])
+
+    def _candidate_rejection(self, data):
+        """Return why a parsed JSON block is unusable, or None if it is a flat license record"""
+        # Nested objects instead of the flat structure the prompt asks for
+        if not NESTED_STRUCTURE_KEYS.isdisjoint(data):
+            return f"nested JSON structure instead of flat structure: {list(data.keys())}"
+
+        for field, value in data.items():
+            if value is not None and not isinstance(value, (str, int, float)):
+                return f"field '{field}' has nested structure (type: {type(value)}), expecting flat string"
+
+        # Placeholder text instead of values from the OCR text; a bare "null" is just a missing value
+        field_text = "\n".join(value for value in data.values()
+                               if isinstance(value, str) and value.strip().lower() != 'null')
+        if PLACEHOLDER_PATTERN.search(field_text):
+            return "placeholder text instead of actual data"
+
+        return None
 
     def _apply_fallback_extraction(self, ocr_text, extracted_data):
         """Use regex patterns as a fallback to validate/correct extracted fields"""
-        import re
-
         logger.info("Applying fallback extraction validation...")
 
         # Create a copy to modify
         corrected = extracted_data.copy()
 
         # Fallback for Sex field (common issue)
-        sex_match = re.search(r'15\s*SEX\s+([MF])', ocr_text, re.IGNORECASE)
+        sex_match = FALLBACK_SEX_PATTERN.search(ocr_text)
         if sex_match:
             fallback_sex = sex_match.group(1).upper()
             if extracted_data.get('sex') != fallback_sex:
@@ -384,7 +866,7 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
             # Likely extracted street address instead
             logger.warning(f"DLN appears to be street address: '{dln}'")
             # Try to find the actual DLN
-            dln_match = re.search(r'4d\s*DLN\s+([A-Z0-9-]+)', ocr_text, re.IGNORECASE)
+            dln_match = FALLBACK_DLN_PATTERN.search(ocr_text)
             if dln_match:
                 fallback_dln = dln_match.group(1)
                 logger.info(f"Correcting DLN: '{dln}' -> '{fallback_dln}'")
@@ -394,7 +876,7 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
         last_name = extracted_data.get('last_name', '')
         if last_name and len(last_name.split()) == 1:
             # Try to find multi-word last name
-            name_match = re.search(r'2\s+([A-Z][A-Z\s]+?)(?:\n|3\s|$)', ocr_text)
+            name_match = FALLBACK_LAST_NAME_PATTERN.search(ocr_text)
             if name_match:
                 fallback_name = name_match.group(1).strip()
                 if len(fallback_name.split()) > 1:
@@ -405,7 +887,7 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
         dob = extracted_data.get('date_of_birth', '')
         if dob and '/2020' in dob:
             # Very unlikely - probably parsing error
-            dob_match = re.search(r'3\s*DOB\s+(\d{2}/\d{2}/\d{4})', ocr_text)
+            dob_match = FALLBACK_DOB_PATTERN.search(ocr_text)
             if dob_match:
                 fallback_dob = dob_match.group(1)
                 logger.info(f"Correcting DOB: '{dob}' -> '{fallback_dob}' (suspicious year)")
@@ -415,7 +897,7 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
         exp_date = extracted_data.get('expiration_date', '')
         if exp_date and '/2020' in exp_date:
             # Likely wrong or expired
-            exp_match = re.search(r'4b\s*EXP\s+(\d{2}/\d{2}/\d{4})', ocr_text)
+            exp_match = FALLBACK_EXP_PATTERN.search(ocr_text)
             if exp_match:
                 fallback_exp = exp_match.group(1)
                 logger.info(f"Correcting expiration: '{exp_date}' -> '{fallback_exp}'")
@@ -426,26 +908,20 @@ Replace null with actual values from the OCR text. Keep the exact same JSON stru
     def process_sequential(self, image_paths):
         logger.info("Processing with sequential model loading (memory-efficient mode)")
 
+        # One batched OCR call over every page, then Surya is freed before LLAMA loads, so only
+        # one model is ever resident (8GB M1 machines)
         logger.info("Step 1: Running Surya OCR...")
         predictions = self.run_ocr(image_paths)
-
-        ocr_texts = []
-        for pred in predictions:
-            text_lines = []
-            for text_line in pred.text_lines:
-                text_lines.append(text_line.text)
-            ocr_texts.append("\n".join(text_lines))
+        ocr_texts = ["\n".join([text_line.text for text_line in pred.text_lines]) for pred in predictions]
 
         self.unload_surya_models()
 
         logger.info("Step 2: Extracting fields with LLAMA...")
-        results = []
-        for ocr_text in ocr_texts:
-            extracted_data = self.extract_fields_with_llama(ocr_text)
-            results.append({
-                'raw_ocr_text': ocr_text,
-                'extracted_data': extracted_data
-            })
+        extracted = self.extract_fields_with_llama_batch(ocr_texts)
+        results = [
+            {'raw_ocr_text': ocr_text, 'extracted_data': extracted_data}
+            for ocr_text, extracted_data in zip(ocr_texts, extracted)
+        ]
 
         self.unload_llama_model()
 
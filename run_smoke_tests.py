@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Smoke Test Runner
+Runs the independent smoke-test scripts concurrently and reports their results
+"""
+
+import os
+import sys
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Script -> extra environment. The preprocessing check needs no GPU, so it is kept off the
+# device and the Surya test has it to itself
+SMOKE_TESTS = [
+    ('test_preprocessing.py', {'CUDA_VISIBLE_DEVICES': ''}),
+    ('test_surya_direct.py', {}),
+]
+
+
+def run_script(script, extra_env):
+    env = dict(os.environ, **extra_env)
+    return subprocess.run([sys.executable, script], env=env, capture_output=True, text=True)
+
+
+def main():
+    # Each script runs in its own process; threads only wait on them
+    with ThreadPoolExecutor(max_workers=len(SMOKE_TESTS)) as executor:
+        results = list(executor.map(lambda test: run_script(*test), SMOKE_TESTS))
+
+    failed = []
+    for (script, _), result in zip(SMOKE_TESTS, results):
+        print("=" * 70)
+        print(f"{script} (exit code {result.returncode})")
+        print("=" * 70)
+        print(result.stdout)
+        if result.stderr:
+            print(result.stderr)
+        if result.returncode != 0:
+            failed.append(script)
+
+    if failed:
+        print(f"✗ Failed: {', '.join(failed)}")
+        return False
+
+    print("✓ All smoke tests passed")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -28,6 +28,10 @@ if ! python -c "import torch" 2>/dev/null; then
     echo ""
 fi
 
+# Byte-compile the app modules once so the backend and the test scripts skip compilation on import
+echo "Precompiling Python modules..."
+python -m compileall -q *.py
+
 # Start backend server in background
 echo "Starting backend server (Surya + LLAMA) on port 5001..."
 python backend_surya_llama.py > flask_server.log 2>&1 &
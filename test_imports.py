@@ -28,7 +28,8 @@ try:
     print("\n3. Testing database.py...")
     from database import DatabaseManager
     print("   ✓ DatabaseManager imported successfully")
-    db = DatabaseManager()
+    from _singletons import database_manager
+    db = database_manager()
     print(f"   ✓ DatabaseManager instantiated (supabase={'connected' if db.supabase else 'not available'})")
 except Exception as e:
     print(f"   ✗ DatabaseManager failed: {e}")
@@ -39,7 +40,8 @@ try:
     print("\n4. Testing license_extractor.py...")
     from license_extractor import LicenseExtractor
     print("   ✓ LicenseExtractor imported successfully")
-    extractor = LicenseExtractor()
+    from _singletons import license_extractor
+    extractor = license_extractor()
     print("   ✓ LicenseExtractor instantiated")
 except Exception as e:
     print(f"   ✗ LicenseExtractor failed: {e}")
@@ -50,7 +52,8 @@ try:
     print("\n5. Testing model_manager.py...")
     from model_manager import ModelManager
     print("   ✓ ModelManager imported successfully")
-    manager = ModelManager()
+    from _singletons import model_manager
+    manager = model_manager()
     print(f"   ✓ ModelManager instantiated (device={manager.device})")
 except Exception as e:
     print(f"   ✗ ModelManager failed: {e}")
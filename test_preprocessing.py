@@ -33,8 +33,10 @@ except Exception as e:
 print("\n4. Checking preprocessing methods...")
 try:
     methods = ['preprocess_for_ocr', 'preprocess_light']
+    # One set difference against the class attributes instead of a hasattr probe per method
+    missing = set(methods) - set(dir(type(preprocessor)))
     for method in methods:
-        if hasattr(preprocessor, method):
+        if method not in missing:
             print(f"   ✓ Method '{method}' exists")
         else:
             print(f"   ✗ Method '{method}' not found")
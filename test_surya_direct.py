@@ -5,51 +5,72 @@ Tests if Surya is extracting text from images correctly
 """
 
 import sys
-from model_manager import ModelManager
+import time
+import torch
+from _singletons import model_manager
 from PIL import Image
 import os
 
+# Let cuDNN pick the fastest conv algorithms for the detector's input shapes
+torch.backends.cudnn.benchmark = True
+
 print("="*70)
 print("SURYA OCR DIRECT TEST")
 print("="*70)
 print()
 
-# Check for test image
+# Collect every available test image so they all go through one batched OCR call
 test_images = ['test_license.jpg', 'license.jpg', 'sample.jpg', 'test.png']
-test_image = None
-
-for img in test_images:
-    if os.path.exists(img):
-        test_image = img
-        break
+# One directory read instead of a stat() per candidate name
+with os.scandir('.') as entries:
+    available = {entry.name for entry in entries if entry.is_file()}
+candidates = [img for img in test_images if img in available]
 
-if not test_image:
+if not candidates:
     print("ERROR: No test image found!")
     print("Please place a driver's license image as 'test_license.jpg'")
     sys.exit(1)
 
-print(f"Using test image: {test_image}")
+print(f"Using test images: {', '.join(candidates)}")
 print()
 
-# Check image properties
-img = Image.open(test_image)
-print(f"Image properties:")
-print(f"  Size: {img.size}")
-print(f"  Mode: {img.mode}")
-print(f"  Format: {img.format}")
-print()
+# Check image properties; Image.open only parses the header, and OCR is handed the file
+# paths, so no pixels are decoded here
+EXIF_ORIENTATION_TAG = 0x0112
+for test_image in candidates:
+    with Image.open(test_image) as img:
+        print(f"Image properties ({test_image}):")
+        print(f"  Size: {img.size}")
+        print(f"  Mode: {img.mode}")
+        print(f"  Format: {img.format}")
+        # Orientations 5-8 are rotated by 90 degrees, so the upright page has width/height swapped
+        if img.getexif().get(EXIF_ORIENTATION_TAG) in (5, 6, 7, 8):
+            print(f"  Upright size (EXIF rotated): {img.size[::-1]}")
+        print()
 
 # Initialize model manager
 print("Initializing ModelManager...")
-manager = ModelManager()
+manager = model_manager()
 print(f"Using device: {manager.device}")
 print()
 
+# Load the models up front; loading also runs a detection + recognition warmup pass on a
+# dummy text page, so the timed call below measures steady-state throughput rather than
+# one-time initialization
+print("Loading and warming up Surya models...")
+start = time.perf_counter()
+manager.load_surya_models()
+print(f"Models ready in {time.perf_counter() - start:.2f}s")
+print()
+
 # Run OCR
 print("Running Surya OCR...")
 try:
-    predictions = manager.run_ocr([test_image])
+    start = time.perf_counter()
+    predictions = manager.run_ocr(candidates)
+    elapsed = time.perf_counter() - start
     print(f"✓ OCR completed successfully")
+    print(f"  {len(candidates)} page(s) in {elapsed:.2f}s ({len(candidates) / elapsed:.2f} pages/sec)")
     print()
 except Exception as e:
     print(f"✗ OCR FAILED: {e}")
@@ -71,15 +92,19 @@ if len(predictions) == 0:
     print("This means Surya OCR failed to process the image")
     sys.exit(1)
 
-for pred_idx, pred in enumerate(predictions):
-    print(f"Prediction #{pred_idx}")
+# Every prediction has the same type, so inspect its attributes once rather than per page
+pred_attrs = [attr for attr in dir(predictions[0]) if not attr.startswith('_')]
+has_text_lines = 'text_lines' in pred_attrs
+
+for pred_idx, (test_image, pred) in enumerate(zip(candidates, predictions)):
+    print(f"Prediction #{pred_idx} ({test_image})")
     print("-" * 70)
     print(f"  Type: {type(pred)}")
-    print(f"  Attributes: {[attr for attr in dir(pred) if not attr.startswith('_')]}")
+    print(f"  Attributes: {pred_attrs}")
     print()
 
     # Check for text_lines attribute
-    if hasattr(pred, 'text_lines'):
+    if has_text_lines:
         print(f"  ✓ Has 'text_lines' attribute")
         print(f"  Number of text lines: {len(pred.text_lines)}")
         print()
@@ -99,16 +124,20 @@ for pred_idx, pred in enumerate(predictions):
             print("  Extracted text:")
             print("  " + "=" * 68)
 
+            # Format every line first and write the block once; dense pages have hundreds of lines
             all_text = []
+            output = []
             for line_idx, text_line in enumerate(pred.text_lines):
-                if hasattr(text_line, 'text'):
+                try:
                     text = text_line.text
-                    all_text.append(text)
-                    print(f"  [{line_idx:3d}] {text}")
-                else:
-                    print(f"  [{line_idx:3d}] ERROR: No 'text' attribute")
-                    print(f"         Type: {type(text_line)}")
-                    print(f"         Attributes: {dir(text_line)}")
+                except AttributeError:
+                    output.append(f"  [{line_idx:3d}] ERROR: No 'text' attribute")
+                    output.append(f"         Type: {type(text_line)}")
+                    output.append(f"         Attributes: {dir(text_line)}")
+                    continue
+                all_text.append(text)
+                output.append(f"  [{line_idx:3d}] {text}")
+            sys.stdout.write("\n".join(output) + "\n")
 
             print("  " + "=" * 68)
             print()
@@ -135,16 +164,15 @@ for pred_idx, pred in enumerate(predictions):
         print("  This suggests Surya OCR API has changed!")
         print()
         print("  Available attributes:")
-        for attr in dir(pred):
-            if not attr.startswith('_'):
-                print(f"    - {attr}: {type(getattr(pred, attr, None))}")
+        for attr in pred_attrs:
+            print(f"    - {attr}: {type(getattr(pred, attr, None))}")
         print()
         print("  Attempting alternative access methods...")
 
         # Try alternative methods
-        if hasattr(pred, 'text'):
+        if 'text' in pred_attrs:
             print(f"  ✓ Found 'text' attribute: {pred.text[:200]}")
-        if hasattr(pred, 'bboxes'):
+        if 'bboxes' in pred_attrs:
             print(f"  ✓ Found 'bboxes' attribute: {len(pred.bboxes)} boxes")
         if isinstance(pred, dict):
             print(f"  ✓ Prediction is a dict: {list(pred.keys())}")